@@ -1,6 +1,7 @@
 package main
 
 import (
+	"bytes"
 	"database/sql"
 	"encoding/json"
 	"flag"
@@ -11,6 +12,7 @@ import (
 	"os"
 	"path/filepath"
 	"strconv"
+	"strings"
 
 	_ "github.com/go-sql-driver/mysql"
 	"github.com/gorilla/mux"
@@ -70,6 +72,23 @@ type Book struct {
 	Details    string `json:"details"`
 }
 
+// BatchCall describes a single sub-request inside a batch
+type BatchCall struct {
+	CallID int    `json:"call_id"`
+	Method string `json:"method"`
+	URL    string `json:"url"`
+}
+
+// BatchResult holds the response of a single sub-request inside a batch
+type BatchResult struct {
+	CallID int             `json:"call_id"`
+	Status int             `json:"status"`
+	Body   json.RawMessage `json:"body"`
+}
+
+// maxBatchCalls bounds how many sub-requests a single batch may carry
+const maxBatchCalls = 20
+
 // setupRouter configures the application's routes
 func (app *App) setupRouter() *mux.Router {
 	r := mux.NewRouter()
@@ -111,6 +130,9 @@ func (app *App) setupRouter() *mux.Router {
 	// Routes for login
 	r.HandleFunc("/signup", app.SignupUser).Methods("POST")
 	r.HandleFunc("/login", app.LoginUser).Methods("POST")
+
+	// Route for running several reads in one round trip
+	r.HandleFunc("/batch", app.Batch(r)).Methods("POST")
 	return r
 }
 
@@ -1305,3 +1327,98 @@ func (app *App) DeleteSubscriber(w http.ResponseWriter, r *http.Request) {
 
 	fmt.Fprintln(w, "Subscriber deleted successfully")
 }
+
+// batchResponseWriter buffers the response of a sub-request so it can be embedded in the batch reply
+type batchResponseWriter struct {
+	header http.Header
+	status int
+	body   bytes.Buffer
+}
+
+func (bw *batchResponseWriter) Header() http.Header {
+	return bw.header
+}
+
+func (bw *batchResponseWriter) Write(b []byte) (int, error) {
+	// Like net/http, the first write without an explicit status means 200
+	if bw.status == 0 {
+		bw.status = http.StatusOK
+	}
+	return bw.body.Write(b)
+}
+
+func (bw *batchResponseWriter) WriteHeader(status int) {
+	// Ignore superfluous calls, as net/http does
+	if bw.status == 0 {
+		bw.status = status
+	}
+}
+
+// batchBody embeds JSON responses as they are and wraps anything else as a JSON string
+func batchBody(b []byte) json.RawMessage {
+	if json.Valid(b) {
+		return json.RawMessage(b)
+	}
+	encoded, _ := json.Marshal(strings.TrimSpace(string(b)))
+	return encoded
+}
+
+// Batch runs several GET sub-requests against the router and returns all responses in a single reply
+func (app *App) Batch(router http.Handler) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		app.Logger.Println("Batch handler called")
+
+		var calls []BatchCall
+		if err := json.NewDecoder(r.Body).Decode(&calls); err != nil {
+			HandleError(w, app.Logger, "Invalid JSON data", err, http.StatusBadRequest)
+			return
+		}
+
+		if len(calls) == 0 || len(calls) > maxBatchCalls {
+			HandleError(w, app.Logger, fmt.Sprintf("Batch must contain between 1 and %d calls", maxBatchCalls), nil, http.StatusBadRequest)
+			return
+		}
+
+		results := make([]BatchResult, 0, len(calls))
+		for _, call := range calls {
+			results = append(results, app.runBatchCall(router, r, call))
+		}
+
+		RespondWithJSON(w, http.StatusOK, results)
+	}
+}
+
+// runBatchCall dispatches one sub-request through the router and captures its response
+func (app *App) runBatchCall(router http.Handler, parent *http.Request, call BatchCall) BatchResult {
+	result := BatchResult{CallID: call.CallID}
+
+	// Only reads are batched, which also rules out nested batches
+	if call.Method != http.MethodGet || !strings.HasPrefix(call.URL, "/") {
+		result.Status = http.StatusBadRequest
+		result.Body = batchBody([]byte("Only GET sub-requests to API paths are supported"))
+		return result
+	}
+
+	req, err := http.NewRequestWithContext(parent.Context(), call.Method, call.URL, nil)
+	if err != nil {
+		app.Logger.Printf("Invalid batch sub-request %q: %v", call.URL, err)
+		result.Status = http.StatusBadRequest
+		result.Body = batchBody([]byte("Invalid sub-request URL"))
+		return result
+	}
+
+	// Forward the caller's cookies (session token) to the sub-request
+	for _, cookie := range parent.Cookies() {
+		req.AddCookie(cookie)
+	}
+
+	rec := &batchResponseWriter{header: make(http.Header)}
+	router.ServeHTTP(rec, req)
+
+	if rec.status == 0 {
+		rec.status = http.StatusOK
+	}
+	result.Status = rec.status
+	result.Body = batchBody(rec.body.Bytes())
+	return result
+}
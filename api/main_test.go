@@ -4024,3 +4024,141 @@ func TestDeleteSubscriber_MethodNotAllowed(t *testing.T) {
 	assert.Equal(t, http.StatusMethodNotAllowed, rr.Code)
 	assert.Contains(t, rr.Body.String(), "Only DELETE method is supported")
 }
+
+// TestBatch_Success tests that the Batch handler runs each sub-request and returns the responses by call_id
+func TestBatch_Success(t *testing.T) {
+	app, mock := createTestApp(t)
+	defer app.DB.Close()
+
+	router := app.setupRouter()
+
+	authorRows := sqlmock.NewRows([]string{"id", "lastname", "firstname", "photo"}).
+		AddRow(1, "Doe", "John", "photo.jpg")
+	mock.ExpectQuery(`SELECT id, Lastname, Firstname, photo FROM authors ORDER BY Lastname, Firstname`).
+		WillReturnRows(authorRows)
+
+	subscriberRows := sqlmock.NewRows([]string{"lastname", "firstname", "email"}).
+		AddRow("Smith", "Jane", "jane.smith@example.com")
+	mock.ExpectQuery(`SELECT lastname, firstname, email FROM subscribers`).WillReturnRows(subscriberRows)
+
+	body := []byte(`[{"call_id": 0, "method": "GET", "url": "/authors"}, {"call_id": 1, "method": "GET", "url": "/subscribers"}]`)
+	req := httptest.NewRequest("POST", "/batch", bytes.NewBuffer(body))
+	req.Header.Set("Content-Type", "application/json")
+
+	rr := httptest.NewRecorder()
+	router.ServeHTTP(rr, req)
+
+	assert.Equal(t, http.StatusOK, rr.Code)
+
+	var results []BatchResult
+	err := json.Unmarshal(rr.Body.Bytes(), &results)
+	assert.NoError(t, err)
+	assert.Len(t, results, 2)
+
+	assert.Equal(t, 0, results[0].CallID)
+	assert.Equal(t, http.StatusOK, results[0].Status)
+	var authors []Author
+	assert.NoError(t, json.Unmarshal(results[0].Body, &authors))
+	assert.Equal(t, []Author{{ID: 1, Lastname: "Doe", Firstname: "John", Photo: "photo.jpg"}}, authors)
+
+	assert.Equal(t, 1, results[1].CallID)
+	assert.Equal(t, http.StatusOK, results[1].Status)
+	var subscribers []Subscriber
+	assert.NoError(t, json.Unmarshal(results[1].Body, &subscribers))
+	assert.Equal(t, []Subscriber{{Lastname: "Smith", Firstname: "Jane", Email: "jane.smith@example.com"}}, subscribers)
+
+	if err := mock.ExpectationsWereMet(); err != nil {
+		t.Errorf("Not all expectations were met: %v", err)
+	}
+}
+
+// TestBatch_SubRequestError tests that a failing sub-request keeps its own status and message
+func TestBatch_SubRequestError(t *testing.T) {
+	app, _ := createTestApp(t)
+	defer app.DB.Close()
+
+	router := app.setupRouter()
+
+	body := []byte(`[{"call_id": 7, "method": "GET", "url": "/books/abc"}]`)
+	req := httptest.NewRequest("POST", "/batch", bytes.NewBuffer(body))
+
+	rr := httptest.NewRecorder()
+	router.ServeHTTP(rr, req)
+
+	assert.Equal(t, http.StatusOK, rr.Code)
+
+	var results []BatchResult
+	assert.NoError(t, json.Unmarshal(rr.Body.Bytes(), &results))
+	assert.Len(t, results, 1)
+	assert.Equal(t, 7, results[0].CallID)
+	assert.Equal(t, http.StatusBadRequest, results[0].Status)
+	assert.Equal(t, `"Invalid book ID"`, string(results[0].Body))
+}
+
+// TestBatch_OnlyGET tests that non-GET sub-requests are rejected without being executed
+func TestBatch_OnlyGET(t *testing.T) {
+	app, mock := createTestApp(t)
+	defer app.DB.Close()
+
+	router := app.setupRouter()
+
+	body := []byte(`[{"call_id": 0, "method": "DELETE", "url": "/authors/1"}, {"call_id": 1, "method": "GET", "url": "http://example.com/authors"}]`)
+	req := httptest.NewRequest("POST", "/batch", bytes.NewBuffer(body))
+
+	rr := httptest.NewRecorder()
+	router.ServeHTTP(rr, req)
+
+	assert.Equal(t, http.StatusOK, rr.Code)
+
+	var results []BatchResult
+	assert.NoError(t, json.Unmarshal(rr.Body.Bytes(), &results))
+	assert.Len(t, results, 2)
+	for _, result := range results {
+		assert.Equal(t, http.StatusBadRequest, result.Status)
+	}
+
+	if err := mock.ExpectationsWereMet(); err != nil {
+		t.Errorf("Not all expectations were met: %v", err)
+	}
+}
+
+// TestBatch_InvalidJSON tests the Batch handler with a malformed body
+func TestBatch_InvalidJSON(t *testing.T) {
+	app, _ := createTestApp(t)
+	defer app.DB.Close()
+
+	router := app.setupRouter()
+
+	req := httptest.NewRequest("POST", "/batch", bytes.NewBuffer([]byte("invalid json")))
+
+	rr := httptest.NewRecorder()
+	router.ServeHTTP(rr, req)
+
+	assert.Equal(t, http.StatusBadRequest, rr.Code)
+	assert.Contains(t, rr.Body.String(), "Invalid JSON data")
+}
+
+// TestBatch_TooManyCalls tests that empty and oversized batches are rejected
+func TestBatch_TooManyCalls(t *testing.T) {
+	app, _ := createTestApp(t)
+	defer app.DB.Close()
+
+	router := app.setupRouter()
+
+	calls := make([]BatchCall, maxBatchCalls+1)
+	for i := range calls {
+		calls[i] = BatchCall{CallID: i, Method: "GET", URL: "/authors"}
+	}
+
+	for _, batch := range [][]BatchCall{{}, calls} {
+		body, err := json.Marshal(batch)
+		assert.NoError(t, err)
+
+		req := httptest.NewRequest("POST", "/batch", bytes.NewBuffer(body))
+		rr := httptest.NewRecorder()
+		router.ServeHTTP(rr, req)
+
+		assert.Equal(t, http.StatusBadRequest, rr.Code)
+		assert.Contains(t, rr.Body.String(), "Batch must contain between 1 and")
+	}
+}
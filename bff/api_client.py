@@ -0,0 +1,301 @@
+import hashlib
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+from threading import Lock
+
+import orjson
+import requests
+from flask import Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = os.getenv("API_URL", "http://localhost:8080")
+
+# API endpoints, built once instead of on every request
+BOOKS_URL = API_URL + "/books"
+AUTHORS_URL = API_URL + "/authors"
+SUBSCRIBERS_URL = API_URL + "/subscribers"
+NEW_BOOK_URL = API_URL + "/books/new"
+NEW_AUTHOR_URL = API_URL + "/authors/new"
+NEW_SUBSCRIBER_URL = API_URL + "/subscribers/new"
+SEARCH_BOOKS_URL = API_URL + "/search_books"
+SEARCH_AUTHORS_URL = API_URL + "/search_authors"
+SIGNUP_URL = API_URL + "/signup"
+LOGIN_URL = API_URL + "/login"
+BATCH_URL = API_URL + "/batch"
+
+# Per-id paths: prefixes are built once and joined with the id by plain
+# concatenation, which is cheaper than formatting a template on every call
+BOOK_PATH = "/books/"
+_BOOK_PREFIX = API_URL + BOOK_PATH
+_AUTHOR_PREFIX = API_URL + "/authors/"
+_BOOK_PHOTO_PREFIX = API_URL + "/books/photo/"
+_AUTHOR_PHOTO_PREFIX = API_URL + "/author/photo/"
+
+
+def book_url(book_id):
+    return _BOOK_PREFIX + str(book_id)
+
+
+def author_url(author_id):
+    return _AUTHOR_PREFIX + str(author_id)
+
+
+def book_photo_url(book_id):
+    return _BOOK_PHOTO_PREFIX + str(book_id)
+
+
+def author_photo_url(author_id):
+    return _AUTHOR_PHOTO_PREFIX + str(author_id)
+
+
+# (connect, read) timeout in seconds for every call to the API
+TIMEOUT = (1, 5)
+
+# Shared session so every call to the API reuses keep-alive connections
+# instead of opening a new socket per request
+api_session = requests.Session()
+
+# All calls go to a single API host, so one pool is enough. Size it for bursts
+# of concurrent requests so they reuse sockets instead of opening throwaway ones.
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "100"))
+
+# Bounded retries with a short backoff so a flapping API costs a few hundred
+# milliseconds instead of an error page. Failed connects are retried for every
+# method since nothing reached the API; read errors and gateway statuses only for
+# idempotent methods, so a slow POST never creates a record twice. On the last
+# attempt the response is handed back to the view instead of raising.
+API_RETRY = Retry(
+    total=2,
+    connect=2,
+    read=1,
+    backoff_factor=0.1,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({'GET', 'PUT', 'DELETE'}),
+    raise_on_status=False
+)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    # Raised instead of calling the API while the breaker is open
+    pass
+
+
+class CircuitBreaker:
+    # After fail_max failed calls in a row, stop calling the API for
+    # reset_timeout seconds so requests fail at once instead of each holding a
+    # worker for the full timeout. Then exactly one call is let through to probe
+    # the API while the rest keep failing fast: a success closes the breaker
+    # again, a failure reopens it for another reset_timeout.
+
+    def __init__(self, fail_max, reset_timeout):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = Lock()
+
+    def check(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("The API is unavailable, try again shortly")
+            # Admit this call as the probe; restarting the open period keeps
+            # every other caller failing fast until the probe reports back
+            self._opened_at = now
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(fail_max=5, reset_timeout=30)
+
+
+class BreakerAdapter(HTTPAdapter):
+    # Every call to the API passes through here, after its retries have run,
+    # so the breaker sees one outcome per call
+
+    def send(self, request, **kwargs):
+        breaker.check()
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            breaker.record_failure()
+            raise
+        if response.status_code in API_RETRY.status_forcelist:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+adapter = BreakerAdapter(
+    pool_connections=1,
+    pool_maxsize=API_POOL_SIZE,
+    max_retries=API_RETRY
+)
+api_session.mount('http://', adapter)
+api_session.mount('https://', adapter)
+
+# The session is shared by every user, so it must never keep cookies from API
+# responses and replay them on someone else's request. Views forward the
+# caller's token explicitly instead.
+api_session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+# Content-Type is left to each call so multipart photo uploads keep their boundary
+api_session.headers.update({'Accept': 'application/json'})
+
+# Headers for calls whose body is JSON encoded with orjson
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Worker pool for background photo uploads, so add_author and add_book can
+# redirect without waiting for the API to store the photo
+executor = ThreadPoolExecutor(max_workers=8)
+
+
+def read_json(response):
+    # orjson decodes the raw body noticeably faster than response.json()
+    return orjson.loads(response.content)
+
+
+def orjsonify(*args, **kwargs):
+    # Drop-in for flask.jsonify that serialises with orjson
+    data = args[0] if args else kwargs
+    return Response(orjson.dumps(data), mimetype='application/json')
+
+
+def payload_etag(content):
+    # blake2b is faster than md5 and a 16 byte digest is plenty for an ETag
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def read_json_tagged(response):
+    # For stream=True responses: decode straight off the socket so the body is
+    # not also kept around as response.content. Also return an ETag for the raw
+    # payload so a page built from it can be revalidated without rendering it.
+    content = response.raw.read(decode_content=True)
+    return orjson.loads(content), payload_etag(content)
+
+
+# Identical GETs that are already in flight, so concurrent callers share one API call
+_inflight = {}
+_inflight_lock = Lock()
+
+
+def coalesced(key, fetch):
+    # Run fetch() once for all concurrent callers with the same key and hand
+    # every one of them its result (or its exception)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+
+    if not leader:
+        return future.result()
+
+    try:
+        result = fetch()
+        future.set_result(result)
+        return result
+    except BaseException as err:
+        future.set_exception(err)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def fetch_json(url, headers=None):
+    # GET a JSON resource and return (status_code, body, etag); body and etag
+    # are None on errors. Callers share the decoded body, so it must not be mutated.
+    def fetch():
+        with api_session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            if not response.ok:
+                return response.status_code, None, None
+            return (response.status_code, *read_json_tagged(response))
+
+    # The forwarded cookie is part of the key so users never share responses
+    key = (url, headers.get('Cookie') if headers else None)
+    return coalesced(key, fetch)
+
+
+def batch_fetch(paths, headers=None):
+    # Run several GETs against the API in one round trip, keyed by call_id
+    calls = [{'call_id': i, 'method': 'GET', 'url': path} for i, path in enumerate(paths)]
+    response = api_session.post(BATCH_URL, data=orjson.dumps(calls),
+                                headers={**JSON_HEADERS, **(headers or {})}, timeout=TIMEOUT)
+    response.raise_for_status()
+    return {result['call_id']: result for result in read_json(response)}
+
+
+# Form dropdowns reuse the authors list for a few seconds, which absorbs bursts
+# of form renders. The cache lives in each gunicorn worker and writes only
+# clear the worker that handled them, so the TTL is kept short: another worker
+# may show a list missing a new author for up to AUTHORS_CACHE_TTL seconds.
+AUTHORS_CACHE_TTL = 3
+
+# generation is bumped on every clear, so a fetch that started before a write
+# can tell its list is stale and not store it
+_authors_cache = {'authors': None, 'expires': 0.0, 'generation': 0}
+_authors_lock = Lock()
+
+
+def cached_authors():
+    # Return the cached authors list, or None when it is missing or expired
+    with _authors_lock:
+        if time.monotonic() < _authors_cache['expires']:
+            return _authors_cache['authors']
+    return None
+
+
+def authors_generation():
+    # Capture before fetching the list, then pass it to store_authors
+    with _authors_lock:
+        return _authors_cache['generation']
+
+
+def store_authors(authors, generation):
+    with _authors_lock:
+        if generation != _authors_cache['generation']:
+            return
+        _authors_cache['authors'] = authors
+        _authors_cache['expires'] = time.monotonic() + AUTHORS_CACHE_TTL
+
+
+def clear_authors_cache():
+    # Only affects this worker; the others catch up when their entry expires
+    with _authors_lock:
+        _authors_cache['authors'] = None
+        _authors_cache['expires'] = 0.0
+        _authors_cache['generation'] += 1
+
+
+def _fetch_authors():
+    generation = authors_generation()
+    response = api_session.get(AUTHORS_URL, timeout=TIMEOUT)
+    response.raise_for_status()
+    authors = read_json(response)
+    store_authors(authors, generation)
+    return authors
+
+
+def get_authors_cached():
+    authors = cached_authors()
+    if authors is None:
+        # When the cache expires under load only one caller refetches the list
+        authors = coalesced('authors', _fetch_authors)
+    return authors
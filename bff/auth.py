@@ -1,12 +1,12 @@
-from flask import Flask, request, redirect, url_for, make_response, jsonify, render_template
+from flask import Blueprint, current_app, request, redirect, url_for, make_response, render_template
+import orjson
 import requests
-import os
 import datetime
+from api_client import SIGNUP_URL, LOGIN_URL, TIMEOUT, JSON_HEADERS, api_session, orjsonify, read_json
 
-API_URL = os.getenv("API_URL", "http://localhost:8080")  
-
-app = Flask(__name__)
+auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.route('/register', methods=['POST', 'GET'])
 def signup():
     if request.method == "GET":
         return render_template('sign_up.html')
@@ -18,30 +18,32 @@ def signup():
                 'password': request.form.get('password')
             }
 
-            # Log the data to verify it before sending
-            print(f"Sending data to API: {data}")
+            # Never log the password
+            current_app.logger.debug("Signup request for email=%s", data['email'])
 
             # Send the request with JSON data
-            r = requests.post(
-                f'{API_URL}/signup',
-                json=data,  
-                headers={'Content-Type': 'application/json'}
+            r = api_session.post(
+                SIGNUP_URL,
+                data=orjson.dumps(data),
+                headers=JSON_HEADERS,
+                timeout=TIMEOUT
             )
 
-            response_json = r.json()
+            response_json = read_json(r)
 
-            if r.status_code == 201:
-                return redirect(url_for("login_route"))
+            if r.ok:
+                return redirect(url_for("auth.login"), code=303)
             elif r.status_code in (400, 409):
                 error_message = response_json.get("message")
                 return render_template('sign_up.html', error=error_message)
             elif r.status_code == 500:
-                return make_response(jsonify({"error": response_json.get("message")}), 500)
+                return make_response(orjsonify({"error": response_json.get("message")}), 500)
             else:
-                return make_response(jsonify({"error": "An unexpected error occurred"}), r.status_code)
+                return make_response(orjsonify({"error": "An unexpected error occurred"}), r.status_code)
         except requests.RequestException as e:
-            return make_response(jsonify({"error": "Failed to connect to the external API", "details": str(e)}), 500)
+            return make_response(orjsonify({"error": "Failed to connect to the external API", "details": str(e)}), 500)
 
+@auth_bp.route('/login', methods=['POST', 'GET'])
 def login():
     if request.method == "GET":
         return render_template("login.html")
@@ -53,42 +55,43 @@ def login():
             'password': request.form.get('password')
         }
 
-        # Log the data to verify it before sending
-        print(f"Sending data to API: {data}")
+        # Never log the password
+        current_app.logger.debug("Login request for email=%s", data['email'])
 
         # Send the request with JSON data
         try:
-            r = requests.post(
-                f'{API_URL}/login',
-                json=data,
-                headers={'Content-Type': 'application/json'}
+            r = api_session.post(
+                LOGIN_URL,
+                data=orjson.dumps(data),
+                headers=JSON_HEADERS,
+                timeout=TIMEOUT
             )
             
-            if r.status_code == 200:
+            if r.ok:
                 # Extract token from API response
-                userToken = r.json().get("token")
+                userToken = read_json(r).get("token")
                 
                 # Set the token in a cookie with expiration date
                 expire_date = datetime.datetime.now() + datetime.timedelta(days=1)
-                resp = make_response(redirect("/"))  # Redirect to homepage or other URL
+                resp = make_response(redirect("/", code=303))  # Redirect to homepage or other URL
                 resp.set_cookie("token", value=userToken, expires=expire_date)
 
                 return resp
             
             elif r.status_code in [400, 404]:
                 # Handle client errors (e.g., invalid login or user not found)
-                error_message = r.json().get("message")
+                error_message = read_json(r).get("message")
                 return render_template('login.html', error=error_message)
 
             elif r.status_code == 500:
                 # Handle server errors
-                return make_response(jsonify({"error": "Internal server error"}), 500)
+                return make_response(orjsonify({"error": "Internal server error"}), 500)
 
         except requests.RequestException as e:
             # Handle connection errors (e.g., API not reachable)
-            return make_response(jsonify({"error": "Failed to connect to the API", "details": str(e)}), 500)
+            return make_response(orjsonify({"error": "Failed to connect to the API", "details": str(e)}), 500)
 
-@app.route('/logout')
+@auth_bp.route('/logout', methods=['GET'])
 def logout():
     resp = make_response(redirect("/"))
     resp.set_cookie('token', '', expires=0)
@@ -0,0 +1,21 @@
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+# Every view blocks on the API, so gevent workers let each process multiplex
+# many in-flight requests. The gevent worker monkey-patches the standard
+# library (sockets, threads, locks) before main.py is imported, which makes
+# requests and the api_client executor cooperative.
+worker_class = "gevent"
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Size each worker's API connection pool to its greenlet count so concurrent
+# requests never open throwaway sockets. Workers inherit this environment.
+os.environ.setdefault("API_POOL_SIZE", str(worker_connections))
+
+# Keep idle browser connections open between page and asset requests instead
+# of paying a new TCP handshake for each one (gunicorn's default is 2 seconds)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "30"))
@@ -1,87 +1,261 @@
-from flask import Flask, render_template, jsonify, request, url_for, send_from_directory, redirect, json, make_response
+from flask import (Flask, Request, abort, render_template, request, url_for, redirect, Response,
+                   stream_with_context)
+import gzip
+import hashlib
+import logging
+import orjson
 import requests
 import os
-from functools import wraps
+import shutil
+import tempfile
+from functools import lru_cache, partial, wraps
+from pathlib import Path
+from types import MappingProxyType
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+from werkzeug.middleware.shared_data import SharedDataMiddleware
 from werkzeug.utils import secure_filename
-from auth import signup, login, logout
+from auth import auth_bp
+from api_client import (TIMEOUT, JSON_HEADERS, api_session, executor, orjsonify, read_json, read_json_tagged,
+                        CircuitOpenError, breaker, payload_etag, fetch_json, batch_fetch, cached_authors,
+                        authors_generation, store_authors, clear_authors_cache, get_authors_cached,
+                        book_url, author_url, book_photo_url, author_photo_url, BOOKS_URL, AUTHORS_URL,
+                        SUBSCRIBERS_URL, NEW_BOOK_URL, NEW_AUTHOR_URL, NEW_SUBSCRIBER_URL, SEARCH_BOOKS_URL,
+                        SEARCH_AUTHORS_URL, BOOK_PATH)
 
-ALLOWED_EXTENSIONS = set(['txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif'])
+ALLOWED_EXTENSIONS = frozenset({'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif'})
 
-app = Flask(__name__)
+# Copy uploads to disk in 1 MiB chunks rather than Werkzeug's default 16 KiB
+UPLOAD_BUFFER_SIZE = 1 << 20
 
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
+logging.basicConfig(level=logging.INFO)
 
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
+class LibraryRequest(Request):
+    # Text fields in our forms are tiny, so cap what the form parser may hold
+    # in memory for them. Uploaded files still spill to a temporary file once
+    # they outgrow Werkzeug's 500 KiB in-memory buffer.
+    max_form_memory_size = 64 * 1024
 
-API_URL = os.getenv("API_URL", "http://localhost:8080")  
+app = Flask(__name__)
+app.request_class = LibraryRequest
+
+# Keep compiled templates on disk so a restarted or newly forked worker loads
+# them instead of compiling every template again. Set before anything touches
+# app.jinja_env, which creates the environment.
+app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache()}
+app.register_blueprint(auth_bp)
+
+# Refuse oversized request bodies before Werkzeug parses them
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+
+# Let browsers reuse CSS/JS/images for an hour instead of refetching them through Flask on every page
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
+
+@lru_cache(maxsize=None)
+def asset_version(filename):
+    # Short content hash of a static file, computed once per process
+    with open(os.path.join(app.static_folder, filename), 'rb') as file:
+        return hashlib.blake2b(file.read(), digest_size=8).hexdigest()
+
+@app.context_processor
+def inject_asset_url():
+    # Versioned asset URLs change whenever the file does, so browsers can cache them for good
+    def asset_url(filename):
+        return url_for('static', filename=filename, v=asset_version(filename))
+    return {'asset_url': asset_url}
+
+def compute_render_version():
+    # Digest of every template and CSS/JS file, so a deploy that changes how
+    # pages look also changes the ETags of pages tagged from API payloads
+    hasher = hashlib.blake2b(digest_size=8)
+    for path in sorted(Path(app.root_path, app.template_folder).rglob('*')):
+        if path.is_file():
+            hasher.update(path.read_bytes())
+    static = Path(app.static_folder)
+    for folder in ('css', 'js'):
+        for path in sorted((static / folder).rglob('*')):
+            if path.is_file():
+                hasher.update(asset_version(path.relative_to(static).as_posix()).encode())
+    return hasher.hexdigest()
+
+RENDER_VERSION = compute_render_version()
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def stream_template(template_name, **context):
+    # Flask 2.0 has no stream_template: send the page in chunks while the
+    # template renders instead of building the whole HTML string first
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    stream = template.stream(context)
+    stream.enable_buffering(20)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+def tagged_page(payload_tag, template_name, **context):
+    # The page is a pure function of the API payload and the template it is
+    # rendered with, so their digests make the page's ETag: a browser that
+    # already has it gets a 304 before the template is rendered at all
+    etag = payload_etag(f"{RENDER_VERSION}:{template_name}:{payload_tag}".encode())
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = stream_template(template_name, **context)
+    response.set_etag(etag)
+    return response
 
 def validate_body_length(max_length, field_limits=None):
-    if field_limits is None:
-        field_limits = {}
+    # Freeze the limits once per decorated view instead of on every request
+    field_limits = MappingProxyType(dict(field_limits or {}))
 
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             if request.method in ['POST', 'PUT']:
-                data = request.form.to_dict()
                 total_length = 0
 
-                for key, value in data.items():
-                    if key in field_limits:
-                        if len(value) > field_limits[key]:
-                            return jsonify(success=False, error=f"{key.capitalize()} field too long, should not exceed {field_limits[key]} characters."), 400
-                    total_length += len(value)
-                if total_length > max_length:
-                    return jsonify(success=False, error=f"Request body too long, should not exceed {max_length} characters."), 400
+                # Walk the form fields in place and stop at the first one over a limit
+                for key, value in request.form.items(multi=True):
+                    value_length = len(value)
+                    limit = field_limits.get(key)
+                    if limit is not None and value_length > limit:
+                        return orjsonify(success=False, error=f"{key.capitalize()} field too long, should not exceed {limit} characters."), 400
+                    total_length += value_length
+                    if total_length > max_length:
+                        return orjsonify(success=False, error=f"Request body too long, should not exceed {max_length} characters."), 400
 
             return func(*args, **kwargs)
         return wrapper
     return decorator
 
-@app.route('/')
-def index():
-    try:
-        session_token = request.cookies.get('token')
+# Pages that only render data read from the API
+CACHEABLE_ENDPOINTS = frozenset({
+    'index', 'search_books', 'search_authors', 'book_details', 'get_subscribers', 'get_authors'
+})
+
+@app.after_request
+def add_asset_cache_headers(response):
+    # A versioned asset URL never changes content, so it may be cached for a year
+    if request.endpoint == 'static' and 'v' in request.args and response.status_code == 200:
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
+# Endpoints that serve files from static/, and the text types worth compressing
+ASSET_ENDPOINTS = frozenset({'static'})
+COMPRESSIBLE_MIMETYPES = frozenset({'text/css', 'application/javascript', 'text/javascript'})
+
+# Gzipped asset bodies keyed by path and file version, so each version is compressed once
+_gzipped_assets = {}
+
+@app.after_request
+def compress_assets(response):
+    # CSS and JS shrink 3-4x with gzip; images are already compressed
+    if (request.endpoint not in ASSET_ENDPOINTS or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if 'gzip' in request.accept_encodings:
+        key = (request.path, response.last_modified, response.content_length)
+        body = _gzipped_assets.get(key)
+        response.direct_passthrough = False
+        if body is None:
+            body = _gzipped_assets[key] = gzip.compress(response.get_data())
+        else:
+            response.close()
+        response.set_data(body)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers.pop('Accept-Ranges', None)
+    return response
 
-        if not session_token:
-            return redirect('/login')
+@app.after_request
+def add_cache_headers(response):
+    # Let browsers keep read-only pages and revalidate them with an ETag, so an
+    # unchanged page costs a bodyless 304 instead of a full download. Streamed
+    # pages are tagged by their view from the API payload; the rest are hashed here.
+    if (request.method == 'GET' and request.endpoint in CACHEABLE_ENDPOINTS
+            and response.status_code in (200, 304)):
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        if not response.is_streamed and response.status_code == 200:
+            response.set_etag(payload_etag(response.get_data()))
+            response.make_conditional(request)
+    return response
 
-        # Set up headers to include the session token cookie when sending the request to the API
-        headers = {
-            'Cookie': f'token={session_token}'
-        }
+class UpstreamError(Exception):
+    # The API answered a write with an unexpected status
+    def __init__(self, message=None):
+        super().__init__(message)
+        self.message = message
+
+@app.errorhandler(UpstreamError)
+def handle_upstream_error(err):
+    return orjsonify(success=False, error=err.message), 400
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_too_large(err):
+    return orjsonify(success=False, error="Upload too large"), 413
+
+@app.errorhandler(CircuitOpenError)
+def handle_circuit_open(err):
+    # The API is known to be down: answer at once instead of waiting on it
+    response = orjsonify(success=False, error=str(err))
+    response.status_code = 503
+    response.headers['Retry-After'] = str(breaker.reset_timeout)
+    return response
 
-        response = requests.get(f"{API_URL}/books", headers=headers)
-        if response.status_code != 200:
-            print(response.status_code)
-            return "You are unathorized!", 400
-        books = response.json()
-        return render_template('books.html', books=books)
-    except Exception as err:
-        return str(err), 500
+@app.errorhandler(requests.RequestException)
+def handle_request_exception(err):
+    # The API could not be reached or answered with an error status
+    app.logger.error("API request failed: %s", err)
+    return orjsonify(success=False, error=str(err)), 502
+
+@app.errorhandler(Exception)
+def handle_unexpected_error(err):
+    # Anything else a view did not handle; HTTP errors such as 404 keep their own response
+    if isinstance(err, HTTPException):
+        return err
+    app.logger.exception("Unhandled error on %s", request.path)
+    return orjsonify(success=False, error=str(err)), 500
+
+def _proxy(method, url, *, json=None, error=None):
+    # Send one call to the API and raise UpstreamError unless it answers with a 2xx
+    if json is None:
+        response = api_session.request(method, url, timeout=TIMEOUT)
+    else:
+        response = api_session.request(method, url, data=orjson.dumps(json), headers=JSON_HEADERS, timeout=TIMEOUT)
+    if not response.ok:
+        raise UpstreamError(error)
+    return response
 
-@app.route('/register', methods=['POST', 'GET'])
-def register():
-    return signup()
+@app.route('/')
+def index():
+    session_token = request.cookies.get('token')
+
+    if not session_token:
+        return redirect('/login')
 
-@app.route('/login', methods=['POST', 'GET'])
-def login_route():
-    return login()
+    # Set up headers to include the session token cookie when sending the request to the API
+    headers = {
+        'Cookie': f'token={session_token}'
+    }
 
-@app.route('/logout', methods=['GET'])
-def logout_route():
-    return logout()
+    status_code, books, etag = fetch_json(BOOKS_URL, headers=headers)
+    if status_code != 200:
+        app.logger.debug("Listing books failed with status %s", status_code)
+        return "You are unathorized!", 400
+    return tagged_page(etag, 'books.html', books=books)
 
 @app.route('/search_books', methods=['GET'])
 def search_books():
     query = request.args.get('query', '')
-    response = requests.get(f'{API_URL}/search_books', params={'query': query})
-    
-    if response.status_code != 200:
-        return f"Error: {response.text}", response.status_code
-    
-    books = response.json()
+    with api_session.get(SEARCH_BOOKS_URL, params={'query': query}, stream=True, timeout=TIMEOUT) as response:
+        if not response.ok:
+            return f"Error: {response.text}", response.status_code
+
+        books, etag = read_json_tagged(response)
     
     if books is None or not books:
         books = []
@@ -89,104 +263,85 @@ def search_books():
     else:
         message = ""
 
-    return render_template('books.html', books=books, message=message)
+    return tagged_page(etag, 'books.html', books=books, message=message)
 
 @app.route('/search_authors', methods=['GET'])
 def search_authors():
     query = request.args.get('query', '')
-    response = requests.get(f'{API_URL}/search_authors', params={'query': query})
-    
-    if response.status_code != 200:
-        return f"Error: {response.text}", response.status_code
-    authors = response.json()
+    with api_session.get(SEARCH_AUTHORS_URL, params={'query': query}, stream=True, timeout=TIMEOUT) as response:
+        if not response.ok:
+            return f"Error: {response.text}", response.status_code
+        authors, etag = read_json_tagged(response)
     
     if authors is None or not authors:
         authors = []
         message = "Was not found"
     else:
         message = ""
-    return render_template('authors.html', authors=authors, message=message)
+    return tagged_page(etag, 'authors.html', authors=authors, message=message)
 
 
 @app.route('/book-details/<int:book_id>')
 def book_details(book_id):
-    try:
-        response = requests.get(f"{API_URL}/books/{book_id}")
-        response.raise_for_status() 
-        book = response.json()
-        app.logger.debug(f"Book details: {book}")
-        return render_template('book_details.html', book=book)
-    except requests.RequestException as err:
-        app.logger.error(f"Error fetching book details: {err}")
-        return f"Error fetching book details: {err}", 500
+    response = api_session.get(book_url(book_id), timeout=TIMEOUT)
+    if response.status_code == 404:
+        abort(404, description="Book not found")
+    response.raise_for_status()
+    book = read_json(response)
+    app.logger.debug("Book details: %s", book)
+    return render_template('book_details.html', book=book)
     
 @app.route('/subscribers', methods=['GET'])
 def get_subscribers():
-    try:
-        session_token = request.cookies.get('token')
+    session_token = request.cookies.get('token')
 
-        if not session_token:
-            return redirect('/login')
+    if not session_token:
+        return redirect('/login')
 
-        # Set up headers to include the session token cookie when sending the request to the API
-        headers = {
-            'Cookie': f'token={session_token}'
-        }
+    # Set up headers to include the session token cookie when sending the request to the API
+    headers = {
+        'Cookie': f'token={session_token}'
+    }
 
-        response = requests.get(f"{API_URL}/subscribers", headers=headers)
-        if response.status_code == 200:
-            subscribers = response.json()
-            return render_template('subscribers.html', subscribers=subscribers)
+    with api_session.get(SUBSCRIBERS_URL, headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if response.ok:
+            subscribers, etag = read_json_tagged(response)
         else:
-            error_message = response.json().get('error', 'Failed to retrieve subscribers')
-            app.logger.error(f"Failed to retrieve subscribers: {error_message}")
-            return jsonify(success=False, error=error_message), 500
-    except Exception as err:
-        app.logger.error(f"Failed to retrieve subscribers: {err}")
-        return jsonify(success=False, error=str(err)), 500
+            error_message = read_json(response).get('error', 'Failed to retrieve subscribers')
+            app.logger.error("Failed to retrieve subscribers: %s", error_message)
+            return orjsonify(success=False, error=error_message), 500
+    return tagged_page(etag, 'subscribers.html', subscribers=subscribers)
     
 @app.route('/authors', methods=['GET'])
 def get_authors():
-    try:
-        session_token = request.cookies.get('token')
+    session_token = request.cookies.get('token')
 
-        if not session_token:
-            return redirect('/login')
+    if not session_token:
+        return redirect('/login')
 
-        # Set up headers to include the session token cookie when sending the request to the API
-        headers = {
-            'Cookie': f'token={session_token}'
-        }
+    # Set up headers to include the session token cookie when sending the request to the API
+    headers = {
+        'Cookie': f'token={session_token}'
+    }
 
-        response = requests.get(f"{API_URL}/authors", headers=headers)
-        if response.status_code != 200:
-            return "You are unathorized!", 400
-        
-        authors = response.json()
-        return render_template('authors.html', authors=authors)
-    
-    except Exception as err:
-        return str(err), 500
+    status_code, authors, etag = fetch_json(AUTHORS_URL, headers=headers)
+    if status_code != 200:
+        return "You are unathorized!", 400
+
+    return tagged_page(etag, 'authors.html', authors=authors)
     
 @app.route('/author/<int:author_id>', methods=['DELETE'])
 def delete_author(author_id):
-    try:
-        response = requests.delete(f"{API_URL}/authors/{author_id}")
-        if response.status_code != 200:
-            return jsonify(success=False), 400
-        return jsonify(success=True)
-    except Exception as err:
-        return jsonify(success=False, error=str(err)), 500
+    _proxy('DELETE', author_url(author_id))
+    clear_authors_cache()
+    return orjsonify(success=True)
 
 @app.route('/book/<int:book_id>', methods=['DELETE'])
 def delete_book(book_id):
-    try:
-        response = requests.delete(f"{API_URL}/books/{book_id}")
-        if response.status_code != 200:
-            return jsonify(success=False), 400
-        return jsonify(success=True)
-    except Exception as err:
-        return jsonify(success=False, error=str(err)), 500
+    _proxy('DELETE', book_url(book_id))
+    # The API also removes the author once their last book is deleted
+    clear_authors_cache()
+    return orjsonify(success=True)
 
 @app.route('/update_author_form.html', methods=['GET'])
 def update_author_form():
@@ -207,32 +362,27 @@ def update_author_form():
 @app.route('/author/<int:author_id>', methods=['POST'])
 @validate_body_length(40)
 def update_author(author_id):
-    try:
-        firstname = request.form.get('firstname')
-        lastname = request.form.get('lastname')
-        photo = request.files.get('photo')
-
-        if photo:
-            filename = secure_filename(photo.filename)
-            photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            photo.save(photo_path)
-            photo_url = f'/uploads/{filename}' 
-        else:
-            photo_url = request.form.get('existing_photo')
-
-        data = {
-            'firstname': firstname,
-            'lastname': lastname,
-            'photo': photo_url
-        }
+    photo = request.files.get('photo')
+    if photo and not allowed_file(photo.filename):
+        return orjsonify(success=False, error="File type not allowed"), 400
+
+    data = {
+        'firstname': request.form.get('firstname'),
+        'lastname': request.form.get('lastname'),
+        'photo': request.form.get('existing_photo')
+    }
+    _proxy('PUT', author_url(author_id), json=data, error="Error updating author")
+    clear_authors_cache()
 
-        response = requests.put(f"{API_URL}/authors/{author_id}", json=data)
-        if response.status_code != 200:
-            return jsonify(success=False, error="Error updating author"), 400
+    # The API stores the new photo and points the author at it
+    if photo:
+        resp = forward_photo(*photo_file_info(photo), photo.stream, author_photo_url(author_id))
+        if not resp.ok:
+            app.logger.error("Failed to upload photo for author: %s, %s", resp.status_code, resp.text)
+            return orjsonify(success=False,
+                             error="Author details were saved, but uploading the photo failed"), 502
 
-        return jsonify(success=True)
-    except Exception as err:
-        return jsonify(success=False, error=str(err)), 500
+    return orjsonify(success=True)
 
 @app.route('/add_author', methods=['GET', 'POST'])
 @validate_body_length(40)
@@ -241,6 +391,8 @@ def add_author():
         firstname = request.form.get('firstname')
         lastname = request.form.get('lastname')
         photo = request.files['photo']
+        if photo and not allowed_file(photo.filename):
+            return orjsonify(success=False, error="File type not allowed"), 400
 
        
         data = {
@@ -260,53 +412,74 @@ def add_author():
         # Delete
         # - author/<id>
 
-        try:
-            response = requests.post(f"{API_URL}/authors/new", json=data)
-            if response.status_code == 201:
-                resp_data = response.json()
-                id_author = resp_data.get("id", 0)
-                if (id_author == 0):
-                    error_message = response.json().get('error', 'Failed to add author')
-                    app.logger.error(f"Failed to add photo for author: {error_message}")
-                    # TODO Delete created author...
-                    return jsonify(success=False, error=error_message), 500
-                    
-                url_add_photo = f"{API_URL}/author/photo/{id_author}"        
-                
-                if photo:
-                    filename = secure_filename(photo.filename)
-                    photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    photo.save(photo_path)
-                    
-                    _, file_extension = os.path.splitext(photo_path)
-                    
-                    resp = forward_photo(photo_path, url_add_photo, file_extension)
-                    
-                    if resp.status_code != 200:
-                        print("Error:", resp.status_code, resp.text)
-                        error_message = resp.json().get('error', 'Failed to add author')
-                        app.logger.error(f"Failed to add photo for author: {error_message}, {response.status_code}, {response.text}")
-                        # TODO Delete created author...
-                        return jsonify(success=False, error=error_message), 500
-                
-                return redirect(url_for("get_authors"))
-            else:
-                error_message = response.json().get('error', 'Failed to add author whit status code:' + resp.status_code)
-                app.logger.error(f"Failed to add author: {error_message}")
-                return jsonify(success=False, error=error_message), 500
-        
-        except Exception as err:
-            app.logger.error(f"Failed to add author: {err}")
-            return jsonify(success=False, error=str(err)), 500
+        response = api_session.post(NEW_AUTHOR_URL, data=orjson.dumps(data), headers=JSON_HEADERS, timeout=TIMEOUT)
+        if response.ok:
+            clear_authors_cache()
+            resp_data = read_json(response)
+            id_author = resp_data.get("id", 0)
+            if (id_author == 0):
+                error_message = read_json(response).get('error', 'Failed to add author')
+                app.logger.error("Failed to add photo for author: %s", error_message)
+                # TODO Delete created author...
+                return orjsonify(success=False, error=error_message), 500
+
+            url_add_photo = author_photo_url(id_author)
+
+            if photo:
+                upload_photo_in_background(photo, url_add_photo)
+
+            return redirect(AUTHORS_PAGE, code=303)
+        else:
+            error_message = read_json(response).get('error', f'Failed to add author whit status code: {response.status_code}')
+            app.logger.error("Failed to add author: %s", error_message)
+            return orjsonify(success=False, error=error_message), 500
         
     return render_template('add_author_form.html')
 
-def forward_photo(path, url, extension):
-    with open(path, 'rb') as file:
-        files = {'file': (path, file, f'image/{extension}')}        
-        response = requests.post(url, files=files)
-        
-    return response
+def photo_file_info(photo):
+    # (filename, mimetype) to send along with an uploaded photo
+    filename = secure_filename(photo.filename)
+    _, extension = os.path.splitext(filename)
+    return filename, photo.mimetype or f'image/{extension.lstrip(".")}'
+
+def forward_photo(filename, mimetype, file, url):
+    files = {'file': (filename, file, mimetype)}
+    return api_session.post(url, files=files, timeout=TIMEOUT)
+
+def forward_spooled_photo(filename, mimetype, spool, url):
+    # Runs on the executor; closing the spool deletes the temporary file
+    with spool:
+        return forward_photo(filename, mimetype, spool, url)
+
+def log_photo_upload(url, future):
+    try:
+        response = future.result()
+    except requests.RequestException as err:
+        app.logger.error("Failed to upload photo to %s: %s", url, err)
+        return
+    if not response.ok:
+        app.logger.error("Failed to upload photo to %s: %s, %s", url, response.status_code, response.text)
+
+def upload_photo_in_background(photo, url):
+    # Hand the upload to the executor so the view can redirect without waiting
+    # for the API to store the photo. Werkzeug closes the request's file once
+    # the response is sent, so copy it to an anonymous temporary file first
+    # rather than reading the whole photo into memory.
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(photo.stream, spool, UPLOAD_BUFFER_SIZE)
+    spool.seek(0)
+
+    future = executor.submit(forward_spooled_photo, *photo_file_info(photo), spool, url)
+    future.add_done_callback(partial(log_photo_upload, url))
+
+def authors_for_form():
+    # The book form's author dropdown; served from the shared authors cache and
+    # left empty when the API cannot be reached
+    try:
+        return get_authors_cached()
+    except requests.RequestException as err:
+        app.logger.error("Failed to fetch authors: %s", err)
+        return []
 
 @app.route('/add_book', methods=['GET', 'POST'])
 @validate_body_length(1000, {'title': 50, 'details': 250})
@@ -317,6 +490,8 @@ def add_book():
         author_id = request.form.get('author')
         is_borrowed = request.form.get('is_borrowed', 'off') == 'on'
         photo = request.files['photo']
+        if photo and not allowed_file(photo.filename):
+            return orjsonify(success=False, error="File type not allowed"), 400
 
         data = {
             'title': title,
@@ -327,61 +502,46 @@ def add_book():
         }
 
         try:
-            response = requests.post(f"{API_URL}/books/new", json=data)
+            response = api_session.post(NEW_BOOK_URL, data=orjson.dumps(data), headers=JSON_HEADERS, timeout=TIMEOUT)
             response.raise_for_status()
             
-            resp_data = response.json()
+            resp_data = read_json(response)
             id_book = resp_data.get("id")
             if not id_book:
                 error_message = "Failed to get book ID from API response"
                 app.logger.error(error_message)
-                return render_template('add_book_form.html', authors=authors, error=error_message)
+                return render_template('add_book_form.html', authors=authors_for_form(), error=error_message)
 
             if photo:
-                filename = secure_filename(photo.filename)
-                photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                photo.save(photo_path)
-
-                _, file_extension = os.path.splitext(photo_path)
-                url_add_photo = f"{API_URL}/books/photo/{id_book}"
-                
-                resp = forward_photo(photo_path, url_add_photo, file_extension)
-                if resp.status_code != 200:
-                    error_message = resp.json().get('error', 'Failed to upload photo')
-                    app.logger.error(f"Failed to upload photo: {error_message}")
-                    return render_template('add_book_form.html', authors=authors, error=error_message)
+                upload_photo_in_background(photo, book_photo_url(id_book))
 
-            return redirect(url_for("index"))
+            return redirect(INDEX_PAGE, code=303)
 
         except requests.RequestException as err:
-            app.logger.error(f"Failed to add book: {err}")
-            return render_template('add_book_form.html', authors=authors, error=str(err))
-    try:
-        response = requests.get(f"{API_URL}/authors")
-        response.raise_for_status()
-        authors = response.json()
-    except requests.RequestException as err:
-        app.logger.error(f"Failed to fetch authors: {err}")
-        authors = []
+            app.logger.error("Failed to add book: %s", err)
+            return render_template('add_book_form.html', authors=authors_for_form(), error=str(err))
 
-    return render_template('add_book_form.html', authors=authors)
+    return stream_template('add_book_form.html', authors=authors_for_form())
 
 @app.route('/books/<int:book_id>/photo', methods=['POST'])
 def upload_book_photo(book_id):
     if 'photo' not in request.files:
-        return jsonify({"error": "No photo provided"}), 400
+        return orjsonify({"error": "No photo provided"}), 400
 
     photo = request.files['photo']
-    filename = secure_filename(photo.filename)
-    photo_path = os.path.join('/path/to/photos', filename)
-    
+    if not allowed_file(photo.filename):
+        return orjsonify({"error": "File type not allowed"}), 400
+
+    # Stream the photo on to the API, which stores it and updates the book
     try:
-        photo.save(photo_path)
-        # Optionally, update the book entry with the photo path
-        # update_book_photo_path(book_id, photo_path)
-        return jsonify({"message": "Photo uploaded successfully"}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        response = forward_photo(*photo_file_info(photo), photo.stream, book_photo_url(book_id))
+    except requests.RequestException as err:
+        app.logger.error("Failed to upload photo for book %s: %s", book_id, err)
+        return orjsonify({"error": str(err)}), 502
+    if not response.ok:
+        app.logger.error("Failed to upload photo for book %s: %s, %s", book_id, response.status_code, response.text)
+        return orjsonify({"error": "Error uploading book photo"}), 502
+    return orjsonify({"message": "Photo uploaded successfully"}), 200
 
 @app.route('/add_subscriber', methods=['GET', 'POST'])
 @validate_body_length(40)
@@ -396,84 +556,103 @@ def add_subscriber():
             'lastname': lastname,
             'email': email
         }
-        print(data)
+        app.logger.debug("Adding subscriber email=%s", email)
 
-        try:
-            response = requests.post(f"{API_URL}/subscribers/new", json=data)
-            if response.status_code == 200:
-                return redirect(url_for("get_subscribers"))
-            else:
-                error_message = response.json().get('error', 'Failed to add subscriber')
-                app.logger.error(f"Failed to add subscriber: {error_message}")
-                return jsonify(success=False, error=error_message), 500
-
-        except Exception as err:
-            app.logger.error(f"Failed to add subscriber: {err}")
-            return jsonify(success=False, error=str(err)), 500
+        response = api_session.post(NEW_SUBSCRIBER_URL, data=orjson.dumps(data), headers=JSON_HEADERS, timeout=TIMEOUT)
+        # The API answers 201 Created here
+        if response.ok:
+            return redirect(SUBSCRIBERS_PAGE, code=303)
+        else:
+            error_message = read_json(response).get('error', 'Failed to add subscriber')
+            app.logger.error("Failed to add subscriber: %s", error_message)
+            return orjsonify(success=False, error=error_message), 500
     
     return render_template('add_subscriber.html')
 
 
 @app.route('/update_book/<int:book_id>', methods=['GET'])
 def update_book_form(book_id):
-    try:
-        response = requests.get(f"{API_URL}/books/{book_id}")
-        if response.status_code != 200:
-            return "Error fetching book details from API", 400
-        book = response.json()
+    authors = cached_authors()
+    if authors is None:
+        generation = authors_generation()
+        # Fetch the book and the authors list in a single round trip
+        results = batch_fetch([BOOK_PATH + str(book_id), "/authors"])
+        book_result, authors_result = results[0], results[1]
+    else:
+        response = api_session.get(book_url(book_id), timeout=TIMEOUT)
+        book_result = {'status': response.status_code, 'body': read_json(response) if response.ok else None}
+        authors_result = None
+
+    if book_result['status'] != 200:
+        return "Error fetching book details from API", 400
+    book = book_result['body']
 
-        response = requests.get(f"{API_URL}/authors")
-        if response.status_code != 200:
+    if authors_result is not None:
+        if authors_result['status'] != 200:
             return "Error fetching authors from API", 400
-        authors = response.json()
+        authors = authors_result['body']
+        store_authors(authors, generation)
 
-        return render_template('update_book_form.html', book=book, authors=authors)
-    except Exception as err:
-        return str(err), 500
+    return stream_template('update_book_form.html', book=book, authors=authors)
 
 @app.route('/book/<int:book_id>', methods=['POST'])
 
 @validate_body_length(1000, {'title': 50, 'details': 250})
 def update_book(book_id):
-    try:
-        title = request.form.get('title')
-        details = request.form.get('details')
-        author_id = request.form.get('author')
-        is_borrowed = request.form.get('is_borrowed', 'off') == 'on'
-        photo = request.files['photo']
-
-        if photo:
-            filename = secure_filename(photo.filename)
-            photo_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            photo.save(photo_path)
-            photo_path = f'photos/{filename}'
-        else:
-            photo_path = request.form.get('existing_photo')
-
-        data = {
-            'title': title,
-            'details': details,
-            'author_id': int(author_id),
-            'is_borrowed': is_borrowed,
-            'photo': photo_path
-        }
-
-        response = requests.put(f"{API_URL}/books/{book_id}", json=data)
-        if response.status_code != 200:
-            return jsonify(success=False, error="Error updating book"), 400
-
-        return redirect(url_for('book_details', book_id=book_id))
-    except Exception as err:
-        return jsonify(success=False, error=str(err)), 500
-
-    
-@app.route('/css/<path:filename>')
-def serve_css(filename):
-    return send_from_directory('static/css', filename)
-
-@app.route('/js/<path:filename>')
-def serve_js(filename):
-    return send_from_directory('static/js', filename)
+    photo = request.files['photo']
+    if photo and not allowed_file(photo.filename):
+        return orjsonify(success=False, error="File type not allowed"), 400
 
+    try:
+        author_id = int(request.form.get('author'))
+    except (TypeError, ValueError):
+        return orjsonify(success=False, error="Invalid author"), 400
+
+    data = {
+        'title': request.form.get('title'),
+        'details': request.form.get('details'),
+        'author_id': author_id,
+        'is_borrowed': request.form.get('is_borrowed', 'off') == 'on',
+        'photo': request.form.get('existing_photo')
+    }
+    _proxy('PUT', book_url(book_id), json=data, error="Error updating book")
+
+    # The API stores the new photo and points the book at it
+    if photo:
+        resp = forward_photo(*photo_file_info(photo), photo.stream, book_photo_url(book_id))
+        if not resp.ok:
+            app.logger.error("Failed to upload photo for book: %s, %s", resp.status_code, resp.text)
+            return orjsonify(success=False,
+                             error="Book details were saved, but uploading the photo failed"), 502
+
+    return redirect(url_for('book_details', book_id=book_id), code=303)
+
+
+# Unversioned asset URLs: let browsers keep them for a week
+LEGACY_ASSET_MAX_AGE = 7 * 24 * 3600
+
+# The old /css and /js URLs are served by Werkzeug in front of Flask, so they
+# skip routing, request hooks and the view layer entirely
+app.wsgi_app = SharedDataMiddleware(app.wsgi_app, {
+    '/css': os.path.join(app.static_folder, 'css'),
+    '/js': os.path.join(app.static_folder, 'js'),
+}, cache_timeout=LEGACY_ASSET_MAX_AGE)
+
+# Redirect targets after a successful POST never change, so build them once.
+# 303 makes the browser follow with a GET instead of re-posting the form on refresh.
+with app.test_request_context():
+    INDEX_PAGE = url_for('index')
+    AUTHORS_PAGE = url_for('get_authors')
+    SUBSCRIBERS_PAGE = url_for('get_subscribers')
+
+# Compile every template at import time rather than on the first request that
+# renders it. Outside debug mode Jinja does not check templates for changes.
+for template_name in app.jinja_env.list_templates():
+    app.jinja_env.get_template(template_name)
+
+# Development server only; production runs under gunicorn (see gunicorn_conf.py)
 if __name__ == '__main__':
+    if os.getenv('FLASK_DEV') != '1':
+        raise SystemExit("Refusing to start the development server: set FLASK_DEV=1, "
+                         "or run gunicorn -c gunicorn_conf.py main:app")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+import requests
+
+import api_client
+from api_client import CircuitBreaker, CircuitOpenError
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('api_client.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(fail_max=3, reset_timeout=30)
+
+    def open_breaker(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_closed_lets_calls_through_below_fail_max(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.check()
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.check()
+
+    def test_opens_after_fail_max_failures(self):
+        self.open_breaker()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+        self.now += 29
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+
+    def test_half_open_admits_exactly_one_probe(self):
+        self.open_breaker()
+        self.now += 30
+        self.breaker.check()
+        for _ in range(5):
+            with self.assertRaises(CircuitOpenError):
+                self.breaker.check()
+
+    def test_successful_probe_closes_the_breaker(self):
+        self.open_breaker()
+        self.now += 30
+        self.breaker.check()
+        self.breaker.record_success()
+        self.breaker.check()
+        self.breaker.check()
+        # Closed again: it takes fail_max new failures to reopen
+        self.breaker.record_failure()
+        self.breaker.check()
+
+    def test_failed_probe_reopens_for_a_full_timeout(self):
+        self.open_breaker()
+        self.now += 30
+        self.breaker.check()
+        self.now += 5
+        self.breaker.record_failure()
+        self.now += 29
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+        self.now += 1
+        self.breaker.check()
+
+    def test_open_error_is_a_connection_error(self):
+        # Views and fallbacks that handle requests.ConnectionError keep working
+        self.assertTrue(issubclass(CircuitOpenError, requests.ConnectionError))
+
+
+class AuthorsCacheTest(unittest.TestCase):
+    def setUp(self):
+        api_client.clear_authors_cache()
+        self.addCleanup(api_client.clear_authors_cache)
+
+    def test_stores_a_fetched_list(self):
+        generation = api_client.authors_generation()
+        api_client.store_authors([{'id': 1}], generation)
+        self.assertEqual(api_client.cached_authors(), [{'id': 1}])
+
+    def test_fetch_overtaken_by_a_write_is_not_stored(self):
+        stale = mock.Mock(ok=True, status_code=200)
+
+        def get(*args, **kwargs):
+            # An author is added while the list is on its way back
+            api_client.clear_authors_cache()
+            return stale
+
+        with mock.patch.object(api_client.api_session, 'get', side_effect=get), \
+                mock.patch.object(api_client, 'read_json', return_value=[{'id': 1}]):
+            self.assertEqual(api_client._fetch_authors(), [{'id': 1}])
+        self.assertIsNone(api_client.cached_authors())
+
+
+
+if __name__ == '__main__':
+    unittest.main()